@@ -11,10 +11,14 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import collections
+import contextlib
+import functools
 import os
-from typing import Literal, Optional, Union, Any
+import httpx
+from typing import Callable, ContextManager, Literal, Optional, Union, Any
 from google import genai
-from google.genai import types
+from google.genai import errors, types
 import termcolor
 from google.genai.types import (
     Part,
@@ -24,6 +28,7 @@ from google.genai.types import (
     FunctionResponse,
     FinishReason,
 )
+import random
 import time
 from rich.console import Console
 from rich.table import Table
@@ -31,6 +36,7 @@ from rich.table import Table
 from computers import EnvState, Computer
 
 MAX_RECENT_TURN_WITH_SCREENSHOTS = 3
+MAX_CONSECUTIVE_MALFORMED_FUNCTION_CALLS = 3
 LEGACY_COMPUTER_USE_MODELS = [
     "gemini-2.5-computer-use-preview-10-2025",
     "gemini-3-flash-preview",
@@ -78,6 +84,18 @@ PREDEFINED_COMPUTER_USE_FUNCTIONS = [
     "go_forward",
 ]
 
+# All predefined function names, for fast membership checks.
+COMPUTER_USE_FUNCTION_NAMES = frozenset(
+    PREDEFINED_COMPUTER_USE_FUNCTIONS + LEGACY_PREDEFINED_COMPUTER_USE_FUNCTIONS
+)
+
+# Accepted answers when the safety service asks for confirmation.
+NEGATIVE_CONFIRMATION_ANSWERS = frozenset({"n", "no"})
+CONFIRMATION_ANSWERS = frozenset({"y", "ye", "yes"}) | NEGATIVE_CONFIRMATION_ANSWERS
+
+# Request timeout and rate limiting, all other 4xx errors are permanent.
+RETRYABLE_CLIENT_ERROR_CODES = (408, 429)
+
 
 console = Console()
 
@@ -85,12 +103,137 @@ console = Console()
 # Custom provided functions will return "dict".
 FunctionResponseT = Union[EnvState, dict]
 
+# Handlers receive the function call arguments.
+ActionHandlerT = Callable[[dict[str, Any]], FunctionResponseT]
+
+
+def _is_retryable_error(e: Exception) -> bool:
+    """Returns whether a failed model request is worth retrying.
+
+    Only server errors, timeouts, rate limiting and transport failures are
+    transient. Anything else, such as an invalid argument, a bad API key or a
+    malformed request rejected by the SDK, fails the same way on every attempt.
+    """
+    if isinstance(e, errors.ServerError):
+        return True
+    if isinstance(e, errors.ClientError):
+        return e.code in RETRYABLE_CLIENT_ERROR_CODES
+    return isinstance(e, (httpx.TransportError, ConnectionError, TimeoutError))
+
+
+def _get_retry_after_s(e: Exception) -> Optional[float]:
+    """Returns how long the server asked to wait before retrying a 429, if at all.
+
+    Reads the Retry-After header, falling back to the google.rpc.RetryInfo
+    retryDelay (e.g. "37s") in the error details.
+    """
+    if not isinstance(e, errors.ClientError) or e.code != 429:
+        return None
+    headers = getattr(e.response, "headers", None) or {}
+    try:
+        return float(headers["retry-after"])
+    except (KeyError, ValueError):
+        # Missing, or an HTTP date rather than a number of seconds.
+        pass
+    error = e.details.get("error", {}) if isinstance(e.details, dict) else {}
+    for detail in error.get("details") or []:
+        retry_delay = detail.get("retryDelay")
+        if isinstance(retry_delay, str) and retry_delay.endswith("s"):
+            try:
+                return float(retry_delay[:-1])
+            except ValueError:
+                pass
+    return None
+
+
+def _is_computer_use_screenshot(part: Part) -> bool:
+    """Returns whether the part is a predefined function response with a screenshot."""
+    return bool(
+        part.function_response
+        and part.function_response.parts
+        and part.function_response.name
+        in COMPUTER_USE_FUNCTION_NAMES
+    )
+
 
 def multiply_numbers(x: float, y: float) -> dict:
     """Multiplies two numbers."""
     return {"result": x * y}
 
 
+MULTIPLY_NUMBERS_DECLARATION = types.FunctionDeclaration(
+    name=multiply_numbers.__name__,
+    description=multiply_numbers.__doc__,
+    parameters=types.Schema(
+        type=types.Type.OBJECT,
+        properties={
+            "x": types.Schema(type=types.Type.NUMBER),
+            "y": types.Schema(type=types.Type.NUMBER),
+        },
+        required=["x", "y"],
+    ),
+)
+
+# Exclude any predefined functions here.
+EXCLUDED_PREDEFINED_FUNCTIONS: list[str] = []
+
+# Add your own custom functions here.
+# Declarations are written out by hand rather than derived with
+# `FunctionDeclaration.from_callable`, which introspects the signature
+# on every agent construction.
+CUSTOM_FUNCTION_DECLARATIONS = [
+    # For example:
+    MULTIPLY_NUMBERS_DECLARATION,
+]
+
+GENERATE_CONTENT_CONFIG = GenerateContentConfig(
+    temperature=1,
+    top_p=0.95,
+    top_k=40,
+    max_output_tokens=8192,
+    tools=[
+        types.Tool(
+            computer_use=types.ComputerUse(
+                environment=types.Environment.ENVIRONMENT_BROWSER,
+                excluded_predefined_functions=EXCLUDED_PREDEFINED_FUNCTIONS,
+            ),
+        ),
+        types.Tool(function_declarations=CUSTOM_FUNCTION_DECLARATIONS),
+    ],
+    thinking_config=types.ThinkingConfig(include_thoughts=True),
+)
+
+
+@functools.cache
+def _get_client(
+    api_key: Optional[str],
+    vertexai: bool,
+    project: Optional[str],
+    location: Optional[str],
+) -> genai.Client:
+    """Returns a client shared by all agents with the same configuration.
+
+    Reusing one client lets agents share its connection pool and credentials
+    instead of each paying for new connections.
+    """
+    return genai.Client(
+        api_key=api_key,
+        vertexai=vertexai,
+        project=project,
+        location=location,
+    )
+
+
+def _get_default_client() -> genai.Client:
+    """Returns the shared client configured from the environment."""
+    return _get_client(
+        api_key=os.environ.get("GEMINI_API_KEY"),
+        vertexai=os.environ.get("USE_VERTEXAI", "0").lower() in ["true", "1"],
+        project=os.environ.get("VERTEXAI_PROJECT"),
+        location=os.environ.get("VERTEXAI_LOCATION"),
+    )
+
+
 class BrowserAgent:
     def __init__(
         self,
@@ -98,18 +241,14 @@ class BrowserAgent:
         query: str,
         model_name: str,
         verbose: bool = True,
+        client: Optional[genai.Client] = None,
     ):
         self._browser_computer = browser_computer
         self._query = query
         self._model_name = model_name
         self._verbose = verbose
         self.final_reasoning = None
-        self._client = genai.Client(
-            api_key=os.environ.get("GEMINI_API_KEY"),
-            vertexai=os.environ.get("USE_VERTEXAI", "0").lower() in ["true", "1"],
-            project=os.environ.get("VERTEXAI_PROJECT"),
-            location=os.environ.get("VERTEXAI_LOCATION"),
-        )
+        self._client = client or _get_default_client()
         self._contents: list[Content] = [
             Content(
                 role="user",
@@ -118,241 +257,151 @@ class BrowserAgent:
                 ],
             )
         ]
+        self._malformed_function_call_streak = 0
+        # User turns that still carry screenshots, oldest first.
+        self._screenshot_turns: collections.deque[Content] = collections.deque()
         self._use_legacy_computer_use_function_call = (
             model_name in LEGACY_COMPUTER_USE_MODELS
         )
 
-        # Exclude any predefined functions here.
-        excluded_predefined_functions = []
+        # The config is identical for every agent, so share the module-level one.
+        self._generate_content_config = GENERATE_CONTENT_CONFIG
 
-        # Add your own custom functions here.
-        custom_functions = [
-            # For example:
-            types.FunctionDeclaration.from_callable(
-                client=self._client, callable=multiply_numbers
-            )
-        ]
-
-        self._generate_content_config = GenerateContentConfig(
-            temperature=1,
-            top_p=0.95,
-            top_k=40,
-            max_output_tokens=8192,
-            tools=[
-                types.Tool(
-                    computer_use=types.ComputerUse(
-                        environment=types.Environment.ENVIRONMENT_BROWSER,
-                        excluded_predefined_functions=excluded_predefined_functions,
-                    ),
-                ),
-                types.Tool(function_declarations=custom_functions),
-            ],
-            thinking_config=types.ThinkingConfig(include_thoughts=True),
+        # The screen size is fixed for the lifetime of the computer, so avoid
+        # querying it for every coordinate.
+        self._screen_width, self._screen_height = browser_computer.screen_size()
+        self._action_handlers, self._legacy_action_handlers = (
+            self._build_action_handlers()
         )
 
+    def _build_action_handlers(
+        self,
+    ) -> tuple[dict[str, ActionHandlerT], dict[str, ActionHandlerT]]:
+        """Maps function names to handlers for the current and legacy models."""
+        computer = self._browser_computer
+        common_handlers: dict[str, ActionHandlerT] = {
+            "open_web_browser": lambda args: computer.open_web_browser(),
+            "go_back": lambda args: computer.go_back(),
+            "go_forward": lambda args: computer.go_forward(),
+            "navigate": lambda args: computer.navigate(args["url"]),
+            "drag_and_drop": self._drag_and_drop,
+            # Handle the custom function declarations here.
+            multiply_numbers.__name__: lambda args: multiply_numbers(
+                x=args["x"], y=args["y"]
+            ),
+        }
+        action_handlers: dict[str, ActionHandlerT] = {
+            **common_handlers,
+            "click": lambda args: computer.click_at(**self._denormalize_point(args)),
+            "double_click": lambda args: computer.double_click_at(
+                **self._denormalize_point(args)
+            ),
+            "triple_click": lambda args: computer.triple_click_at(
+                **self._denormalize_point(args)
+            ),
+            "middle_click": lambda args: computer.middle_click_at(
+                **self._denormalize_point(args)
+            ),
+            "right_click": lambda args: computer.right_click_at(
+                **self._denormalize_point(args)
+            ),
+            "mouse_down": lambda args: computer.mouse_down(
+                **self._denormalize_point(args)
+            ),
+            "mouse_up": lambda args: computer.mouse_up(
+                **self._denormalize_point(args)
+            ),
+            "move": lambda args: computer.hover_at(**self._denormalize_point(args)),
+            "type": lambda args: computer.type_text(
+                text=args["text"],
+                press_enter=args.get("press_enter", False),
+            ),
+            "scroll": self._scroll_at,
+            "wait": lambda args: computer.wait(int(args.get("seconds", 1))),
+            "hotkey": lambda args: computer.key_combination(args["keys"]),
+            "press_key": lambda args: computer.press_key(args["key"]),
+            "key_down": lambda args: computer.key_down(args["key"]),
+            "key_up": lambda args: computer.key_up(args["key"]),
+            "take_screenshot": lambda args: computer.take_screenshot(),
+        }
+        legacy_action_handlers: dict[str, ActionHandlerT] = {
+            **common_handlers,
+            "click_at": lambda args: computer.click_at(
+                **self._denormalize_point(args)
+            ),
+            "hover_at": lambda args: computer.hover_at(
+                **self._denormalize_point(args)
+            ),
+            "type_text_at": self._type_text_at,
+            "scroll_document": lambda args: computer.scroll_document(
+                args["direction"]
+            ),
+            "scroll_at": self._scroll_at,
+            "wait_5_seconds": lambda args: computer.wait_5_seconds(),
+            "search": lambda args: computer.search(),
+            "key_combination": lambda args: computer.key_combination(
+                args["keys"].split("+")
+            ),
+        }
+        return action_handlers, legacy_action_handlers
+
     def handle_action(
         self, action: types.FunctionCall, use_legacy_actions: bool
     ) -> FunctionResponseT:
         """Handles the action and returns the environment state."""
         if use_legacy_actions:
             return self.handle_legacy_action(action)
-
-        if action.name == "open_web_browser":
-            return self._browser_computer.open_web_browser()
-        elif action.name == "click":
-            x = self.denormalize_x(action.args["x"])
-            y = self.denormalize_y(action.args["y"])
-            return self._browser_computer.click_at(
-                x=x,
-                y=y,
-            )
-        elif action.name == "double_click":
-            x = self.denormalize_x(action.args["x"])
-            y = self.denormalize_y(action.args["y"])
-            return self._browser_computer.double_click_at(
-                x=x,
-                y=y,
-            )
-        elif action.name == "triple_click":
-            x = self.denormalize_x(action.args["x"])
-            y = self.denormalize_y(action.args["y"])
-            return self._browser_computer.triple_click_at(
-                x=x,
-                y=y,
-            )
-        elif action.name == "middle_click":
-            x = self.denormalize_x(action.args["x"])
-            y = self.denormalize_y(action.args["y"])
-            return self._browser_computer.middle_click_at(
-                x=x,
-                y=y,
-            )
-        elif action.name == "right_click":
-            x = self.denormalize_x(action.args["x"])
-            y = self.denormalize_y(action.args["y"])
-            return self._browser_computer.right_click_at(
-                x=x,
-                y=y,
-            )
-        elif action.name == "mouse_down":
-            x = self.denormalize_x(action.args["x"])
-            y = self.denormalize_y(action.args["y"])
-            return self._browser_computer.mouse_down(
-                x=x,
-                y=y,
-            )
-        elif action.name == "mouse_up":
-            x = self.denormalize_x(action.args["x"])
-            y = self.denormalize_y(action.args["y"])
-            return self._browser_computer.mouse_up(
-                x=x,
-                y=y,
-            )
-        elif action.name == "move":
-            x = self.denormalize_x(action.args["x"])
-            y = self.denormalize_y(action.args["y"])
-            return self._browser_computer.hover_at(
-                x=x,
-                y=y,
-            )
-        elif action.name == "type":
-            press_enter = action.args.get("press_enter", False)
-            return self._browser_computer.type_text(
-                text=action.args["text"],
-                press_enter=press_enter,
-            )
-        elif action.name == "scroll":
-            x = self.denormalize_x(action.args["x"])
-            y = self.denormalize_y(action.args["y"])
-            magnitude = action.args.get("magnitude", 800)
-            direction = action.args["direction"]
-
-            if direction in ("up", "down"):
-                magnitude = self.denormalize_y(magnitude)
-            elif direction in ("left", "right"):
-                magnitude = self.denormalize_x(magnitude)
-            else:
-                raise ValueError("Unknown direction: ", direction)
-            return self._browser_computer.scroll_at(
-                x=x, y=y, direction=direction, magnitude=magnitude
-            )
-        elif action.name == "wait":
-            wait_seconds = int(action.args.get("seconds", 1))
-            return self._browser_computer.wait(wait_seconds)
-        elif action.name == "go_back":
-            return self._browser_computer.go_back()
-        elif action.name == "go_forward":
-            return self._browser_computer.go_forward()
-        elif action.name == "navigate":
-            return self._browser_computer.navigate(action.args["url"])
-        elif action.name == "hotkey":
-            return self._browser_computer.key_combination(action.args["keys"])
-        elif action.name == "press_key":
-            return self._browser_computer.press_key(action.args["key"])
-        elif action.name == "key_down":
-            return self._browser_computer.key_down(action.args["key"])
-        elif action.name == "key_up":
-            return self._browser_computer.key_up(action.args["key"])
-        elif action.name == "take_screenshot":
-            return self._browser_computer.take_screenshot()
-        elif action.name == "drag_and_drop":
-            x = self.denormalize_x(action.args["x"])
-            y = self.denormalize_y(action.args["y"])
-            destination_x = self.denormalize_x(action.args["destination_x"])
-            destination_y = self.denormalize_y(action.args["destination_y"])
-            return self._browser_computer.drag_and_drop(
-                x=x,
-                y=y,
-                destination_x=destination_x,
-                destination_y=destination_y,
-            )
-        # Handle the custom function declarations here.
-        elif action.name == multiply_numbers.__name__:
-            return multiply_numbers(x=action.args["x"], y=action.args["y"])
-        else:
-            raise ValueError(f"Unsupported function: {action}")
+        return self._dispatch_action(self._action_handlers, action)
 
     def handle_legacy_action(self, action: types.FunctionCall) -> FunctionResponseT:
         """Handles the action defined in the legacy models, and returns the environment state."""
-        if action.name == "open_web_browser":
-            return self._browser_computer.open_web_browser()
-        elif action.name == "click_at":
-            x = self.denormalize_x(action.args["x"])
-            y = self.denormalize_y(action.args["y"])
-            return self._browser_computer.click_at(
-                x=x,
-                y=y,
-            )
-        elif action.name == "hover_at":
-            x = self.denormalize_x(action.args["x"])
-            y = self.denormalize_y(action.args["y"])
-            return self._browser_computer.hover_at(
-                x=x,
-                y=y,
-            )
-        elif action.name == "type_text_at":
-            x = self.denormalize_x(action.args["x"])
-            y = self.denormalize_y(action.args["y"])
-            press_enter = action.args.get("press_enter", False)
-            clear_before_typing = action.args.get("clear_before_typing", True)
-            return self._browser_computer.type_text_at(
-                x=x,
-                y=y,
-                text=action.args["text"],
-                press_enter=press_enter,
-                clear_before_typing=clear_before_typing,
-            )
-        elif action.name == "scroll_document":
-            return self._browser_computer.scroll_document(action.args["direction"])
-        elif action.name == "scroll_at":
-            x = self.denormalize_x(action.args["x"])
-            y = self.denormalize_y(action.args["y"])
-            magnitude = action.args.get("magnitude", 800)
-            direction = action.args["direction"]
-
-            if direction in ("up", "down"):
-                magnitude = self.denormalize_y(magnitude)
-            elif direction in ("left", "right"):
-                magnitude = self.denormalize_x(magnitude)
-            else:
-                raise ValueError("Unknown direction: ", direction)
-            return self._browser_computer.scroll_at(
-                x=x, y=y, direction=direction, magnitude=magnitude
-            )
-        elif action.name == "wait_5_seconds":
-            return self._browser_computer.wait_5_seconds()
-
-        elif action.name == "go_back":
-            return self._browser_computer.go_back()
-        elif action.name == "go_forward":
-            return self._browser_computer.go_forward()
-        elif action.name == "search":
-            return self._browser_computer.search()
-        elif action.name == "navigate":
-            return self._browser_computer.navigate(action.args["url"])
-        elif action.name == "key_combination":
-            return self._browser_computer.key_combination(
-                action.args["keys"].split("+")
-            )
-        elif action.name == "drag_and_drop":
-            x = self.denormalize_x(action.args["x"])
-            y = self.denormalize_y(action.args["y"])
-            destination_x = self.denormalize_x(action.args["destination_x"])
-            destination_y = self.denormalize_y(action.args["destination_y"])
-            return self._browser_computer.drag_and_drop(
-                x=x,
-                y=y,
-                destination_x=destination_x,
-                destination_y=destination_y,
-            )
-        # Handle the custom function declarations here.
-        elif action.name == multiply_numbers.__name__:
-            return multiply_numbers(x=action.args["x"], y=action.args["y"])
-        else:
+        return self._dispatch_action(self._legacy_action_handlers, action)
+
+    def _dispatch_action(
+        self, handlers: dict[str, ActionHandlerT], action: types.FunctionCall
+    ) -> FunctionResponseT:
+        handler = handlers.get(action.name)
+        if handler is None:
             raise ValueError(f"Unsupported function: {action}")
+        return handler(action.args or {})
+
+    def _denormalize_point(self, args: dict[str, Any]) -> dict[str, int]:
+        return {
+            "x": self.denormalize_x(args["x"]),
+            "y": self.denormalize_y(args["y"]),
+        }
+
+    def _type_text_at(self, args: dict[str, Any]) -> EnvState:
+        return self._browser_computer.type_text_at(
+            **self._denormalize_point(args),
+            text=args["text"],
+            press_enter=args.get("press_enter", False),
+            clear_before_typing=args.get("clear_before_typing", True),
+        )
+
+    def _scroll_at(self, args: dict[str, Any]) -> EnvState:
+        magnitude = args.get("magnitude", 800)
+        direction = args["direction"]
+
+        if direction in ("up", "down"):
+            magnitude = self.denormalize_y(magnitude)
+        elif direction in ("left", "right"):
+            magnitude = self.denormalize_x(magnitude)
+        else:
+            raise ValueError("Unknown direction: ", direction)
+        return self._browser_computer.scroll_at(
+            **self._denormalize_point(args), direction=direction, magnitude=magnitude
+        )
+
+    def _drag_and_drop(self, args: dict[str, Any]) -> EnvState:
+        return self._browser_computer.drag_and_drop(
+            **self._denormalize_point(args),
+            destination_x=self.denormalize_x(args["destination_x"]),
+            destination_y=self.denormalize_y(args["destination_y"]),
+        )
 
     def get_model_response(
-        self, max_retries=5, base_delay_s=1
+        self, max_retries=5, base_delay_s=1, max_delay_s=30
     ) -> types.GenerateContentResponse:
         for attempt in range(max_retries):
             try:
@@ -363,12 +412,27 @@ class BrowserAgent:
                 )
                 return response  # Return response on success
             except Exception as e:
-                print(e)
+                if not _is_retryable_error(e):
+                    termcolor.cprint(
+                        f"Generating content failed with a non-retryable error: {e}\n",
+                        color="red",
+                    )
+                    raise
                 if attempt < max_retries - 1:
-                    delay = base_delay_s * (2**attempt)
+                    retry_after_s = _get_retry_after_s(e)
+                    if retry_after_s is not None:
+                        # Rate limited: wait as long as the server asked.
+                        delay = min(max_delay_s, retry_after_s)
+                    else:
+                        # Jitter the exponential backoff so that agents sharing
+                        # a quota don't all retry at the same moment.
+                        delay = min(
+                            max_delay_s,
+                            base_delay_s * (2**attempt) * random.uniform(0.5, 1.5),
+                        )
                     message = (
-                        f"Generating content failed on attempt {attempt + 1}. "
-                        f"Retrying in {delay} seconds...\n"
+                        f"Generating content failed on attempt {attempt + 1}: {e}\n"
+                        f"Retrying in {delay:.1f} seconds...\n"
                     )
                     termcolor.cprint(
                         message,
@@ -377,7 +441,7 @@ class BrowserAgent:
                     time.sleep(delay)
                 else:
                     termcolor.cprint(
-                        f"Generating content failed after {max_retries} attempts.\n",
+                        f"Generating content failed after {max_retries} attempts: {e}\n",
                         color="red",
                     )
                     raise
@@ -386,33 +450,30 @@ class BrowserAgent:
         """Extracts the text from the candidate."""
         if not candidate.content or not candidate.content.parts:
             return None
-        text = []
-        for part in candidate.content.parts:
-            if part.text:
-                text.append(part.text)
-        return " ".join(text) or None
+        return (
+            " ".join(part.text for part in candidate.content.parts if part.text)
+            or None
+        )
 
     def extract_function_calls(self, candidate: Candidate) -> list[types.FunctionCall]:
         """Extracts the function call from the candidate."""
         if not candidate.content or not candidate.content.parts:
             return []
-        ret = []
-        for part in candidate.content.parts:
-            if part.function_call:
-                ret.append(part.function_call)
-        return ret
+        return [
+            part.function_call
+            for part in candidate.content.parts
+            if part.function_call
+        ]
+
+    def _status(self, message: str) -> ContextManager:
+        """Shows a spinner while the block runs, only in verbose mode."""
+        if self._verbose:
+            return console.status(message, spinner_style=None)
+        return contextlib.nullcontext()
 
     def run_one_iteration(self) -> Literal["COMPLETE", "CONTINUE"]:
         # Generate a response from the model.
-        if self._verbose:
-            with console.status(
-                "Generating response from Gemini Computer Use...", spinner_style=None
-            ):
-                try:
-                    response = self.get_model_response()
-                except Exception as e:
-                    return "COMPLETE"
-        else:
+        with self._status("Generating response from Gemini Computer Use..."):
             try:
                 response = self.get_model_response()
             except Exception as e:
@@ -439,38 +500,40 @@ class BrowserAgent:
         reasoning = self.get_text(candidate)
         function_calls = self.extract_function_calls(candidate)
 
-        # Retry the request in case of malformed FCs.
+        # Retry the request in case of malformed FCs, but give up if the model
+        # keeps producing them.
         if (
             not function_calls
             and not reasoning
             and candidate.finish_reason == FinishReason.MALFORMED_FUNCTION_CALL
         ):
+            self._malformed_function_call_streak += 1
+            if (
+                self._malformed_function_call_streak
+                >= MAX_CONSECUTIVE_MALFORMED_FUNCTION_CALLS
+            ):
+                termcolor.cprint(
+                    f"Received {self._malformed_function_call_streak} malformed "
+                    "function calls in a row. Stopping the agent loop.",
+                    color="red",
+                )
+                return "COMPLETE"
+            if self._verbose:
+                termcolor.cprint(
+                    "Received a malformed function call. Retrying...",
+                    color="yellow",
+                )
             return "CONTINUE"
+        self._malformed_function_call_streak = 0
 
         if not function_calls:
             print(f"Agent Loop Complete: {reasoning}")
             self.final_reasoning = reasoning
             return "COMPLETE"
 
-        function_call_strs = []
-        for function_call in function_calls:
-            # Print the function call and any reasoning.
-            function_call_str = f"Name: {function_call.name}"
-            if function_call.args:
-                function_call_str += f"\nArgs:"
-                for key, value in function_call.args.items():
-                    function_call_str += f"\n  {key}: {value}"
-            function_call_strs.append(function_call_str)
-
-        table = Table(expand=True)
-        table.add_column(
-            "Gemini Computer Use Reasoning", header_style="magenta", ratio=1
-        )
-        table.add_column("Function Call(s)", header_style="cyan", ratio=1)
-        table.add_row(reasoning, "\n".join(function_call_strs))
         if self._verbose:
-            console.print(table)
-            print()
+            # Print the function calls and any reasoning.
+            self._print_function_calls(reasoning, function_calls)
 
         function_responses = []
         for function_call in function_calls:
@@ -484,14 +547,7 @@ class BrowserAgent:
                     return "COMPLETE"
                 # Explicitly mark the safety check as acknowledged.
                 extra_fr_fields["safety_acknowledgement"] = "true"
-            if self._verbose:
-                with console.status(
-                    "Sending command to Computer...", spinner_style=None
-                ):
-                    fc_result = self.handle_action(
-                        function_call, self._use_legacy_computer_use_function_call
-                    )
-            else:
+            with self._status("Sending command to Computer..."):
                 fc_result = self.handle_action(
                     function_call, self._use_legacy_computer_use_function_call
                 )
@@ -506,7 +562,8 @@ class BrowserAgent:
                         parts=[
                             types.FunctionResponsePart(
                                 inline_data=types.FunctionResponseBlob(
-                                    mime_type="image/png", data=fc_result.screenshot
+                                    mime_type=fc_result.mime_type,
+                                    data=fc_result.screenshot,
                                 )
                             )
                         ],
@@ -517,49 +574,61 @@ class BrowserAgent:
                     FunctionResponse(name=function_call.name, response=fc_result)
                 )
 
-        self._contents.append(
-            Content(
-                role="user",
-                parts=[Part(function_response=fr) for fr in function_responses],
-            )
+        function_response_content = Content(
+            role="user",
+            parts=[Part(function_response=fr) for fr in function_responses],
         )
-
-        # only keep screenshots in the few most recent turns, remove the screenshot images from the old turns.
-        turn_with_screenshots_found = 0
-        for content in reversed(self._contents):
-            if content.role == "user" and content.parts:
-                # check if content has screenshot of the predefined computer use functions.
-                has_screenshot = False
-                for part in content.parts:
-                    if (
-                        part.function_response
-                        and part.function_response.parts
-                        and part.function_response.name
-                        in (PREDEFINED_COMPUTER_USE_FUNCTIONS + LEGACY_PREDEFINED_COMPUTER_USE_FUNCTIONS)
-                    ):
-                        has_screenshot = True
-                        break
-
-                if has_screenshot:
-                    turn_with_screenshots_found += 1
-                    # remove the screenshot image if the number of screenshots exceed the limit.
-                    if turn_with_screenshots_found > MAX_RECENT_TURN_WITH_SCREENSHOTS:
-                        for part in content.parts:
-                            if (
-                                part.function_response
-                                and part.function_response.parts
-                                and part.function_response.name
-                                in (PREDEFINED_COMPUTER_USE_FUNCTIONS + LEGACY_PREDEFINED_COMPUTER_USE_FUNCTIONS)
-                            ):
-                                part.function_response.parts = None
+        self._contents.append(function_response_content)
+        self._prune_old_screenshots(function_response_content)
 
         return "CONTINUE"
 
+    def _print_function_calls(
+        self, reasoning: Optional[str], function_calls: list[types.FunctionCall]
+    ):
+        function_call_strs = []
+        for function_call in function_calls:
+            lines = [f"Name: {function_call.name}"]
+            if function_call.args:
+                lines.append("Args:")
+                lines.extend(
+                    f"  {key}: {value}" for key, value in function_call.args.items()
+                )
+            function_call_strs.append("\n".join(lines))
+
+        table = Table(expand=True)
+        table.add_column(
+            "Gemini Computer Use Reasoning", header_style="magenta", ratio=1
+        )
+        table.add_column("Function Call(s)", header_style="cyan", ratio=1)
+        table.add_row(reasoning, "\n".join(function_call_strs))
+        console.print(table)
+        print()
+
+    def _prune_old_screenshots(self, content: Content):
+        """Records a new user turn and drops screenshots from older turns.
+
+        Only the most recent MAX_RECENT_TURN_WITH_SCREENSHOTS turns with
+        screenshots keep them. The function responses themselves are kept so
+        the tool history stays valid; only the image parts are removed.
+        """
+        if not content.parts or not any(
+            _is_computer_use_screenshot(part) for part in content.parts
+        ):
+            return
+        self._screenshot_turns.append(content)
+        if len(self._screenshot_turns) > MAX_RECENT_TURN_WITH_SCREENSHOTS:
+            # Older turns were already pruned, so only the evicted one needs work.
+            oldest_content = self._screenshot_turns.popleft()
+            for part in oldest_content.parts:
+                if _is_computer_use_screenshot(part):
+                    part.function_response.parts = None
+
     def _get_safety_confirmation(
         self, safety: dict[str, Any]
     ) -> Literal["CONTINUE", "TERMINATE"]:
         if safety["decision"] != "require_confirmation":
-            raise ValueError(f"Unknown safety decision: safety['decision']")
+            raise ValueError(f"Unknown safety decision: {safety['decision']}")
         termcolor.cprint(
             "Safety service requires explicit confirmation!",
             color="yellow",
@@ -567,9 +636,9 @@ class BrowserAgent:
         )
         print(safety["explanation"])
         decision = ""
-        while decision.lower() not in ("y", "n", "ye", "yes", "no"):
+        while decision.lower() not in CONFIRMATION_ANSWERS:
             decision = input("Do you wish to proceed? [Yes]/[No]\n")
-        if decision.lower() in ("n", "no"):
+        if decision.lower() in NEGATIVE_CONFIRMATION_ANSWERS:
             return "TERMINATE"
         return "CONTINUE"
 
@@ -579,7 +648,7 @@ class BrowserAgent:
             status = self.run_one_iteration()
 
     def denormalize_x(self, x: int) -> int:
-        return int(x / 1000 * self._browser_computer.screen_size()[0])
+        return int(x / 1000 * self._screen_width)
 
     def denormalize_y(self, y: int) -> int:
-        return int(y / 1000 * self._browser_computer.screen_size()[1])
+        return int(y / 1000 * self._screen_height)
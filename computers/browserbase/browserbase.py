@@ -16,6 +16,7 @@ import termcolor
 from ..playwright.playwright import PlaywrightComputer
 import browserbase
 from playwright.sync_api import sync_playwright
+from typing import Literal
 
 
 class BrowserbaseComputer(PlaywrightComputer):
@@ -23,8 +24,11 @@ class BrowserbaseComputer(PlaywrightComputer):
         self,
         screen_size: tuple[int, int],
         initial_url: str = "https://www.google.com",
+        screenshot_format: Literal["png", "jpeg", "webp"] = "jpeg",
     ):
-        super().__init__(screen_size, initial_url)
+        super().__init__(
+            screen_size, initial_url, screenshot_format=screenshot_format
+        )
 
     def __enter__(self):
         print("Creating session...")
@@ -57,7 +61,9 @@ class BrowserbaseComputer(PlaywrightComputer):
         )
         self._context = self._browser.contexts[0]
         self._page = self._context.pages[0]
-        self._page.goto(self._initial_url)
+        self._track_network_requests()
+        # See PlaywrightComputer.__enter__.
+        self._page.goto(self._initial_url, wait_until="domcontentloaded")
 
         self._context.on("page", self._handle_new_page)
 
@@ -17,9 +17,10 @@ from typing import Literal
 
 
 class EnvState(pydantic.BaseModel):
-    # The screenshot in PNG format.
+    # The screenshot, encoded as `mime_type`.
     screenshot: bytes
     url: str
+    mime_type: str = "image/png"
 
 
 class Computer(abc.ABC):
@@ -11,6 +11,7 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import base64
 import logging
 import termcolor
 import time
@@ -81,11 +82,18 @@ class PlaywrightComputer(Computer):
         initial_url: str = "https://www.google.com",
         search_engine_url: str = "https://www.google.com",
         highlight_mouse: bool = False,
+        screenshot_format: Literal["png", "jpeg", "webp"] = "jpeg",
+        screenshot_quality: int = 80,
     ):
         self._initial_url = initial_url
         self._screen_size = screen_size
         self._search_engine_url = search_engine_url
         self._highlight_mouse = highlight_mouse
+        self._screenshot_format = screenshot_format
+        # Only used for JPEG and WebP, PNG is lossless.
+        self._screenshot_quality = screenshot_quality
+        self._cdp_session = None
+        self._inflight_requests = 0
 
     def _handle_new_page(self, new_page: playwright.sync_api.Page):
         """The Computer Use model only supports a single tab at the moment.
@@ -97,6 +105,19 @@ class PlaywrightComputer(Computer):
         new_page.close()
         self._page.goto(new_url)
 
+    def _track_network_requests(self):
+        """Counts the page's in-flight requests for wait_5_seconds."""
+        self._inflight_requests = 0
+        self._page.on("request", self._on_request_started)
+        self._page.on("requestfinished", self._on_request_done)
+        self._page.on("requestfailed", self._on_request_done)
+
+    def _on_request_started(self, request: playwright.sync_api.Request):
+        self._inflight_requests += 1
+
+    def _on_request_done(self, request: playwright.sync_api.Request):
+        self._inflight_requests = max(0, self._inflight_requests - 1)
+
     def __enter__(self):
         print("Creating session...")
         self._playwright = sync_playwright().start()
@@ -120,7 +141,10 @@ class PlaywrightComputer(Computer):
             }
         )
         self._page = self._context.new_page()
-        self._page.goto(self._initial_url)
+        self._track_network_requests()
+        # The first model turn only needs the query, not a screenshot, so don't
+        # block on subresources here. current_state() waits for the full load.
+        self._page.goto(self._initial_url, wait_until="domcontentloaded")
 
         self._context.on("page", self._handle_new_page)
 
@@ -298,7 +322,21 @@ class PlaywrightComputer(Computer):
         return self.current_state()
 
     def wait_5_seconds(self) -> EnvState:
-        time.sleep(5)
+        # Return once no request has been in flight for 500ms, capped at 5
+        # seconds. The load state can't be used here: Playwright keeps
+        # "networkidle" set for the rest of the document, so it wouldn't wait
+        # for XHRs or redirects fired after the page loaded.
+        deadline = time.monotonic() + 5
+        idle_since = None
+        while (now := time.monotonic()) < deadline:
+            if self._inflight_requests:
+                idle_since = None
+            elif idle_since is None:
+                idle_since = now
+            elif now - idle_since >= 0.5:
+                break
+            # Waiting through the page also dispatches the request events.
+            self._page.wait_for_timeout(100)
         return self.current_state()
 
     def go_back(self) -> EnvState:
@@ -326,13 +364,18 @@ class PlaywrightComputer(Computer):
         # Normalize all keys to the Playwright compatible version.
         keys = [PLAYWRIGHT_KEY_MAP.get(k.lower(), k) for k in keys]
 
-        for key in keys[:-1]:
-            self._page.keyboard.down(key)
+        if not any("+" in key for key in keys):
+            # Playwright presses and releases a chord like "Control+Shift+T" in
+            # a single driver call rather than one round trip per key.
+            self._page.keyboard.press("+".join(keys))
+        else:
+            for key in keys[:-1]:
+                self._page.keyboard.down(key)
 
-        self._page.keyboard.press(keys[-1])
+            self._page.keyboard.press(keys[-1])
 
-        for key in reversed(keys[:-1]):
-            self._page.keyboard.up(key)
+            for key in reversed(keys[:-1]):
+                self._page.keyboard.up(key)
 
         self._page.wait_for_load_state()
         return self.current_state()
@@ -375,8 +418,32 @@ class PlaywrightComputer(Computer):
         # Even if Playwright reports the page as loaded, it may not be so.
         # Add a manual sleep to make sure the page has finished rendering.
         time.sleep(0.5)
-        screenshot_bytes = self._page.screenshot(type="png", full_page=False)
-        return EnvState(screenshot=screenshot_bytes, url=self._page.url)
+        if self._screenshot_format in ("jpeg", "webp"):
+            # Lossy screenshots are several times smaller than PNG ones, which
+            # shrinks every request sent to the model.
+            screenshot_bytes = self._capture_lossy_screenshot()
+        else:
+            screenshot_bytes = self._page.screenshot(type="png", full_page=False)
+        return EnvState(
+            screenshot=screenshot_bytes,
+            url=self._page.url,
+            mime_type=f"image/{self._screenshot_format}",
+        )
+
+    def _capture_lossy_screenshot(self) -> bytes:
+        # Capture through CDP directly so Chromium can favor encoding speed
+        # over compression, which Playwright's screenshot API doesn't expose.
+        if self._cdp_session is None:
+            self._cdp_session = self._context.new_cdp_session(self._page)
+        result = self._cdp_session.send(
+            "Page.captureScreenshot",
+            {
+                "format": self._screenshot_format,
+                "quality": self._screenshot_quality,
+                "optimizeForSpeed": True,
+            },
+        )
+        return base64.b64decode(result["data"])
 
     def screen_size(self) -> tuple[int, int]:
         viewport_size = self._page.viewport_size
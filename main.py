@@ -24,7 +24,7 @@ from computers import BrowserbaseComputer, PlaywrightComputer
 PLAYWRIGHT_SCREEN_SIZE = (1440, 900)
 
 
-def main() -> int:
+def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(description="Run the browser agent with a query.")
     parser.add_argument(
         "--query",
@@ -52,23 +52,36 @@ def main() -> int:
         default=False,
         help="If possible, highlight the location of the mouse.",
     )
+    parser.add_argument(
+        "--screenshot_format",
+        type=str,
+        choices=("png", "jpeg", "webp"),
+        default="jpeg",
+        help="The image format used for screenshots sent to the model.",
+    )
     parser.add_argument(
         "--model",
         default='gemini-3.5-flash',
         help="Set which main model to use.",
     )
-    args = parser.parse_args()
+    return parser
+
+
+def main() -> int:
+    args = build_parser().parse_args()
 
     if args.env == "playwright":
         env = PlaywrightComputer(
             screen_size=PLAYWRIGHT_SCREEN_SIZE,
             initial_url=args.initial_url,
             highlight_mouse=args.highlight_mouse,
+            screenshot_format=args.screenshot_format,
         )
     elif args.env == "browserbase":
         env = BrowserbaseComputer(
             screen_size=PLAYWRIGHT_SCREEN_SIZE,
-            initial_url=args.initial_url
+            initial_url=args.initial_url,
+            screenshot_format=args.screenshot_format,
         )
     else:
         raise ValueError("Unknown environment: ", args.env)
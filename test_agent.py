@@ -14,15 +14,24 @@
 
 import os
 import unittest
-from unittest.mock import MagicMock, patch
-from google.genai import types
-from agent import BrowserAgent, multiply_numbers
-from computers import EnvState
+import httpx
+from unittest.mock import MagicMock, create_autospec, patch
+from google import genai
+from google.genai import errors, types
+from agent import (
+    BrowserAgent,
+    multiply_numbers,
+    MAX_CONSECUTIVE_MALFORMED_FUNCTION_CALLS,
+    MAX_RECENT_TURN_WITH_SCREENSHOTS,
+    MULTIPLY_NUMBERS_DECLARATION,
+)
+from computers import Computer, EnvState
 
 class TestBrowserAgent(unittest.TestCase):
     def setUp(self):
         os.environ["GEMINI_API_KEY"] = "test_api_key"
-        self.mock_browser_computer = MagicMock()
+        # Spec the computer so calls that drift from its interface fail.
+        self.mock_browser_computer = create_autospec(Computer, instance=True)
         self.mock_browser_computer.screen_size.return_value = (1000, 1000)
         self.agent = BrowserAgent(
             browser_computer=self.mock_browser_computer,
@@ -35,6 +44,52 @@ class TestBrowserAgent(unittest.TestCase):
     def test_multiply_numbers(self):
         self.assertEqual(multiply_numbers(2, 3), {"result": 6})
 
+    def test_multiply_numbers_declaration_matches_signature(self):
+        self.assertEqual(
+            MULTIPLY_NUMBERS_DECLARATION,
+            types.FunctionDeclaration.from_callable(
+                client=genai.Client(api_key="test_api_key"),
+                callable=multiply_numbers,
+            ),
+        )
+
+    def test_agents_share_default_client(self):
+        other_agent = BrowserAgent(
+            browser_computer=self.mock_browser_computer,
+            query="other query",
+            model_name="test_model",
+        )
+        another_agent = BrowserAgent(
+            browser_computer=self.mock_browser_computer,
+            query="another query",
+            model_name="test_model",
+        )
+        self.assertIs(other_agent._client, another_agent._client)
+
+    def test_agents_with_different_config_do_not_share_client(self):
+        agent = BrowserAgent(
+            browser_computer=self.mock_browser_computer,
+            query="test query",
+            model_name="test_model",
+        )
+        with patch.dict(os.environ, {"GEMINI_API_KEY": "other_api_key"}):
+            other_agent = BrowserAgent(
+                browser_computer=self.mock_browser_computer,
+                query="other query",
+                model_name="test_model",
+            )
+        self.assertIsNot(other_agent._client, agent._client)
+
+    def test_explicit_client_overrides_default(self):
+        client = MagicMock()
+        agent = BrowserAgent(
+            browser_computer=self.mock_browser_computer,
+            query="test query",
+            model_name="test_model",
+            client=client,
+        )
+        self.assertIs(agent._client, client)
+
     def test_handle_action_open_web_browser(self):
         action = types.FunctionCall(name="open_web_browser", args={})
         self.agent.handle_action(action, use_legacy_actions=True)
@@ -62,17 +117,149 @@ class TestBrowserAgent(unittest.TestCase):
         self.agent.handle_action(action, use_legacy_actions=True)
         self.mock_browser_computer.navigate.assert_called_once_with("https://example.com")
 
+    def test_handle_action_click(self):
+        self.mock_browser_computer.screen_size.return_value = (1440, 900)
+        agent = BrowserAgent(
+            browser_computer=self.mock_browser_computer,
+            query="test query",
+            model_name="test_model",
+        )
+        action = types.FunctionCall(name="click", args={"x": 500, "y": 500})
+        agent.handle_action(action, use_legacy_actions=False)
+        self.mock_browser_computer.click_at.assert_called_once_with(x=720, y=450)
+
+    def test_handle_action_scroll(self):
+        action = types.FunctionCall(
+            name="scroll", args={"x": 100, "y": 200, "direction": "down", "magnitude": 400}
+        )
+        self.agent.handle_action(action, use_legacy_actions=False)
+        self.mock_browser_computer.scroll_at.assert_called_once_with(
+            x=100, y=200, direction="down", magnitude=400
+        )
+
+    def test_handle_action_key_combination(self):
+        action = types.FunctionCall(name="key_combination", args={"keys": "control+c"})
+        self.agent.handle_action(action, use_legacy_actions=True)
+        self.mock_browser_computer.key_combination.assert_called_once_with(
+            ["control", "c"]
+        )
+
+    def test_handle_action_legacy_only_function(self):
+        action = types.FunctionCall(name="click_at", args={"x": 100, "y": 200})
+        with self.assertRaises(ValueError):
+            self.agent.handle_action(action, use_legacy_actions=False)
+
     def test_handle_action_unknown_function(self):
         action = types.FunctionCall(name="unknown_function", args={})
         with self.assertRaises(ValueError):
             self.agent.handle_action(action, use_legacy_actions=True)
 
+    @patch('builtins.input', side_effect=["maybe", "No"])
+    def test_get_safety_confirmation_terminate(self, mock_input):
+        decision = self.agent._get_safety_confirmation(
+            {"decision": "require_confirmation", "explanation": "test"}
+        )
+        self.assertEqual(decision, "TERMINATE")
+        self.assertEqual(mock_input.call_count, 2)
+
+    def test_get_safety_confirmation_unknown_decision(self):
+        with self.assertRaisesRegex(ValueError, "unexpected_decision"):
+            self.agent._get_safety_confirmation({"decision": "unexpected_decision"})
+
     def test_denormalize_x(self):
         self.assertEqual(self.agent.denormalize_x(500), 500)
 
     def test_denormalize_y(self):
         self.assertEqual(self.agent.denormalize_y(500), 500)
 
+    @patch('agent.time.sleep')
+    def test_get_model_response_retries_server_errors(self, mock_sleep):
+        mock_response = MagicMock()
+        self.agent._client.models.generate_content.side_effect = [
+            errors.ServerError(503, {"error": {"message": "unavailable"}}),
+            mock_response,
+        ]
+
+        self.assertEqual(self.agent.get_model_response(), mock_response)
+        self.assertEqual(self.agent._client.models.generate_content.call_count, 2)
+        mock_sleep.assert_called_once()
+
+    @patch('agent.time.sleep')
+    def test_get_model_response_does_not_retry_client_errors(self, mock_sleep):
+        self.agent._client.models.generate_content.side_effect = errors.ClientError(
+            400, {"error": {"message": "invalid argument"}}
+        )
+
+        with self.assertRaises(errors.ClientError):
+            self.agent.get_model_response()
+        self.assertEqual(self.agent._client.models.generate_content.call_count, 1)
+        mock_sleep.assert_not_called()
+
+    @patch('agent.time.sleep')
+    def test_get_model_response_retries_transport_errors(self, mock_sleep):
+        mock_response = MagicMock()
+        self.agent._client.models.generate_content.side_effect = [
+            httpx.ConnectError("connection reset"),
+            mock_response,
+        ]
+
+        self.assertEqual(self.agent.get_model_response(), mock_response)
+        self.assertEqual(self.agent._client.models.generate_content.call_count, 2)
+
+    @patch('agent.time.sleep')
+    def test_get_model_response_does_not_retry_other_errors(self, mock_sleep):
+        self.agent._client.models.generate_content.side_effect = ValueError(
+            "malformed request"
+        )
+
+        with self.assertRaises(ValueError):
+            self.agent.get_model_response()
+        self.assertEqual(self.agent._client.models.generate_content.call_count, 1)
+        mock_sleep.assert_not_called()
+
+    @patch('agent.random.uniform', return_value=1.5)
+    @patch('agent.time.sleep')
+    def test_get_model_response_caps_jittered_delay(self, mock_sleep, _):
+        self.agent._client.models.generate_content.side_effect = errors.ServerError(
+            503, {"error": {"message": "unavailable"}}
+        )
+
+        with self.assertRaises(errors.ServerError):
+            self.agent.get_model_response(max_retries=3, base_delay_s=1, max_delay_s=2)
+        self.assertEqual(
+            [c.args[0] for c in mock_sleep.call_args_list], [1.5, 2]
+        )
+
+    @patch('agent.time.sleep')
+    def test_get_model_response_honors_retry_delay_on_429(self, mock_sleep):
+        mock_response = MagicMock()
+        self.agent._client.models.generate_content.side_effect = [
+            errors.ClientError(
+                429,
+                {
+                    "error": {
+                        "message": "quota exceeded",
+                        "details": [
+                            {
+                                "@type": "type.googleapis.com/google.rpc.RetryInfo",
+                                "retryDelay": "12s",
+                            }
+                        ],
+                    }
+                },
+            ),
+            errors.ClientError(
+                429,
+                {"error": {"message": "quota exceeded"}},
+                response=httpx.Response(429, headers={"Retry-After": "90"}),
+            ),
+            mock_response,
+        ]
+
+        self.assertEqual(self.agent.get_model_response(), mock_response)
+        # The header is capped at max_delay_s.
+        self.assertEqual([c.args[0] for c in mock_sleep.call_args_list], [12, 30])
+
     @patch('agent.BrowserAgent.get_model_response')
     def test_run_one_iteration_no_function_calls(self, mock_get_model_response):
         mock_response = MagicMock()
@@ -106,6 +293,101 @@ class TestBrowserAgent(unittest.TestCase):
         mock_handle_action.assert_called_once_with(function_call, False)
         self.assertEqual(len(self.agent._contents), 3)
 
+    @patch('agent.BrowserAgent.get_model_response')
+    @patch('agent.BrowserAgent.handle_action')
+    def test_run_one_iteration_passes_screenshot_mime_type(self, mock_handle_action, mock_get_model_response):
+        mock_response = MagicMock()
+        mock_candidate = MagicMock()
+        function_call = types.FunctionCall(name="navigate", args={"url": "https://example.com"})
+        mock_candidate.content.parts = [types.Part(function_call=function_call)]
+        mock_response.candidates = [mock_candidate]
+        mock_get_model_response.return_value = mock_response
+        mock_handle_action.return_value = EnvState(
+            screenshot=b"screenshot", url="https://example.com", mime_type="image/jpeg"
+        )
+
+        self.agent.run_one_iteration()
+
+        function_response = self.agent._contents[-1].parts[0].function_response
+        blob = function_response.parts[0].inline_data
+        self.assertEqual(blob.mime_type, "image/jpeg")
+        self.assertEqual(blob.data, b"screenshot")
+
+    def test_prune_old_screenshots(self):
+        for i in range(MAX_RECENT_TURN_WITH_SCREENSHOTS + 2):
+            content = types.Content(
+                role="user",
+                parts=[
+                    types.Part(
+                        function_response=types.FunctionResponse(
+                            name="navigate",
+                            response={"url": f"https://example.com/{i}"},
+                            parts=[
+                                types.FunctionResponsePart(
+                                    inline_data=types.FunctionResponseBlob(
+                                        mime_type="image/png", data=b"screenshot"
+                                    )
+                                )
+                            ],
+                        )
+                    )
+                ],
+            )
+            self.agent._contents.append(content)
+            self.agent._prune_old_screenshots(content)
+
+        responses = [
+            content.parts[0].function_response
+            for content in self.agent._contents[1:]
+        ]
+        self.assertEqual(
+            [r.parts is not None for r in responses],
+            [False, False] + [True] * MAX_RECENT_TURN_WITH_SCREENSHOTS,
+        )
+        self.assertEqual(responses[0].response, {"url": "https://example.com/0"})
+
+    @patch('agent.Table')
+    @patch('agent.BrowserAgent.get_model_response')
+    @patch('agent.BrowserAgent.handle_action')
+    def test_run_one_iteration_not_verbose_skips_table(
+        self, mock_handle_action, mock_get_model_response, mock_table
+    ):
+        self.agent._verbose = False
+        mock_response = MagicMock()
+        mock_candidate = MagicMock()
+        function_call = types.FunctionCall(name="navigate", args={"url": "https://example.com"})
+        mock_candidate.content.parts = [types.Part(function_call=function_call)]
+        mock_response.candidates = [mock_candidate]
+        mock_get_model_response.return_value = mock_response
+        mock_handle_action.return_value = EnvState(
+            screenshot=b"screenshot", url="https://example.com"
+        )
+
+        self.assertEqual(self.agent.run_one_iteration(), "CONTINUE")
+        mock_table.assert_not_called()
+
+    @patch('agent.BrowserAgent.get_model_response')
+    def test_run_one_iteration_stops_after_repeated_malformed_function_calls(
+        self, mock_get_model_response
+    ):
+        mock_response = MagicMock()
+        mock_candidate = MagicMock()
+        mock_candidate.content.parts = []
+        mock_candidate.finish_reason = types.FinishReason.MALFORMED_FUNCTION_CALL
+        mock_response.candidates = [mock_candidate]
+        mock_get_model_response.return_value = mock_response
+
+        results = [
+            self.agent.run_one_iteration()
+            for _ in range(MAX_CONSECUTIVE_MALFORMED_FUNCTION_CALLS)
+        ]
+
+        self.assertEqual(
+            results,
+            ["CONTINUE"] * (MAX_CONSECUTIVE_MALFORMED_FUNCTION_CALLS - 1)
+            + ["COMPLETE"],
+        )
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -26,6 +26,7 @@ class TestMain(unittest.TestCase):
         mock_args.env = 'playwright'
         mock_args.initial_url = 'test_url'
         mock_args.highlight_mouse = True
+        mock_args.screenshot_format = 'png'
         mock_args.query = 'test_query'
         mock_args.model = 'test_model'
         mock_args.api_server = None
@@ -37,7 +38,8 @@ class TestMain(unittest.TestCase):
         mock_playwright_computer.assert_called_once_with(
             screen_size=main.PLAYWRIGHT_SCREEN_SIZE,
             initial_url='test_url',
-            highlight_mouse=True
+            highlight_mouse=True,
+            screenshot_format='png'
         )
         mock_browser_agent.assert_called_once()
         mock_browser_agent.return_value.agent_loop.assert_called_once()
@@ -54,16 +56,27 @@ class TestMain(unittest.TestCase):
         mock_args.api_server_key = None
         mock_args.initial_url = 'test_url'
         mock_args.highlight_mouse = False
+        mock_args.screenshot_format = 'jpeg'
         mock_arg_parser.return_value.parse_args.return_value = mock_args
 
         main.main()
 
         mock_browserbase_computer.assert_called_once_with(
             screen_size=main.PLAYWRIGHT_SCREEN_SIZE,
-            initial_url='test_url'
+            initial_url='test_url',
+            screenshot_format='jpeg'
         )
         mock_browser_agent.assert_called_once()
         mock_browser_agent.return_value.agent_loop.assert_called_once()
 
+    def test_build_parser_defaults(self):
+        args = main.build_parser().parse_args(['--query', 'test_query'])
+
+        self.assertEqual(args.query, 'test_query')
+        self.assertEqual(args.env, 'playwright')
+        self.assertEqual(args.initial_url, 'https://www.google.com')
+        self.assertFalse(args.highlight_mouse)
+        self.assertEqual(args.screenshot_format, 'jpeg')
+
 if __name__ == '__main__':
     unittest.main()
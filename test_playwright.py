@@ -0,0 +1,180 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import base64
+import unittest
+from unittest.mock import patch, MagicMock
+from computers import PlaywrightComputer
+
+
+class TestPlaywrightComputer(unittest.TestCase):
+
+    def setUp(self):
+        self.computer = PlaywrightComputer(screen_size=(1440, 900))
+        self.computer._page = MagicMock()
+        self.computer.current_state = MagicMock()
+        # Drive time.monotonic() from the page's waits, in whole milliseconds.
+        self.now_ms = 0
+        self.on_wait = None
+
+        def wait_for_timeout(timeout_ms):
+            self.now_ms += timeout_ms
+            if self.on_wait:
+                self.on_wait()
+
+        self.computer._page.wait_for_timeout.side_effect = wait_for_timeout
+        patcher = patch(
+            'computers.playwright.playwright.time.monotonic',
+            side_effect=lambda: self.now_ms / 1000,
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @patch('computers.playwright.playwright.sync_playwright')
+    def test_enter_tracks_requests_before_loading_initial_url(self, mock_sync_playwright):
+        computer = PlaywrightComputer(
+            screen_size=(1440, 900), initial_url="https://example.com"
+        )
+
+        with computer:
+            page = computer._page
+            page.goto.assert_called_once_with(
+                "https://example.com", wait_until="domcontentloaded"
+            )
+            calls = [name for name, _, _ in page.method_calls]
+            self.assertLess(calls.index('on'), calls.index('goto'))
+
+    def test_key_combination_presses_a_single_chord(self):
+        self.computer.key_combination(["control", "c"])
+
+        keyboard = self.computer._page.keyboard
+        keyboard.press.assert_called_once_with("ControlOrMeta+c")
+        keyboard.down.assert_not_called()
+        keyboard.up.assert_not_called()
+
+    def test_key_combination_with_plus_key_presses_keys_one_by_one(self):
+        self.computer.key_combination(["control", "shift", "+"])
+
+        self.assertEqual(
+            self.computer._page.keyboard.method_calls,
+            [
+                ('down', ('ControlOrMeta',), {}),
+                ('down', ('Shift',), {}),
+                ('press', ('+',), {}),
+                ('up', ('Shift',), {}),
+                ('up', ('ControlOrMeta',), {}),
+            ],
+        )
+
+    def test_track_network_requests_registers_listeners(self):
+        self.computer._track_network_requests()
+        events = [c.args[0] for c in self.computer._page.on.call_args_list]
+        self.assertEqual(events, ['request', 'requestfinished', 'requestfailed'])
+
+    def test_wait_5_seconds_waits_on_an_idle_page(self):
+        self.computer.wait_5_seconds()
+        self.assertGreaterEqual(self.now_ms, 500)
+        self.assertLess(self.now_ms, 5000)
+        self.computer._page.wait_for_load_state.assert_not_called()
+        self.computer.current_state.assert_called_once()
+
+    def test_wait_5_seconds_waits_for_requests_started_later(self):
+        request = MagicMock()
+
+        def network_activity():
+            if self.now_ms == 200:
+                self.computer._on_request_started(request)
+            elif self.now_ms >= 1500 and self.computer._inflight_requests:
+                self.computer._on_request_done(request)
+
+        self.on_wait = network_activity
+        self.computer.wait_5_seconds()
+        self.assertGreaterEqual(self.now_ms, 2000)
+        self.assertLess(self.now_ms, 5000)
+
+    def test_wait_5_seconds_is_capped_while_requests_are_in_flight(self):
+        self.computer._on_request_started(MagicMock())
+        self.computer.wait_5_seconds()
+        self.assertEqual(self.now_ms, 5000)
+        self.computer.current_state.assert_called_once()
+
+
+
+class TestPlaywrightComputerScreenshots(unittest.TestCase):
+
+    def setUp(self):
+        patcher = patch('computers.playwright.playwright.time.sleep')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def make_computer(self, **kwargs):
+        computer = PlaywrightComputer(screen_size=(1440, 900), **kwargs)
+        computer._page = MagicMock()
+        computer._page.url = "https://example.com"
+        computer._context = MagicMock()
+        cdp_session = computer._context.new_cdp_session.return_value
+        cdp_session.send.return_value = {
+            "data": base64.b64encode(b"screenshot").decode()
+        }
+        return computer
+
+    def test_current_state_captures_jpeg_through_cdp(self):
+        computer = self.make_computer(screenshot_format="jpeg", screenshot_quality=70)
+
+        state = computer.current_state()
+        computer.current_state()
+
+        computer._context.new_cdp_session.assert_called_once_with(computer._page)
+        cdp_session = computer._context.new_cdp_session.return_value
+        self.assertEqual(cdp_session.send.call_count, 2)
+        cdp_session.send.assert_called_with(
+            "Page.captureScreenshot",
+            {"format": "jpeg", "quality": 70, "optimizeForSpeed": True},
+        )
+        self.assertEqual(state.screenshot, b"screenshot")
+        self.assertEqual(state.mime_type, "image/jpeg")
+        self.assertEqual(state.url, "https://example.com")
+        computer._page.screenshot.assert_not_called()
+
+    def test_current_state_captures_webp_through_cdp(self):
+        computer = self.make_computer(screenshot_format="webp")
+
+        state = computer.current_state()
+
+        computer._context.new_cdp_session.return_value.send.assert_called_once_with(
+            "Page.captureScreenshot",
+            {"format": "webp", "quality": 80, "optimizeForSpeed": True},
+        )
+        self.assertEqual(state.screenshot, b"screenshot")
+        self.assertEqual(state.mime_type, "image/webp")
+
+    def test_current_state_captures_png_through_playwright(self):
+        computer = self.make_computer(screenshot_format="png")
+        computer._page.screenshot.return_value = b"png screenshot"
+
+        state = computer.current_state()
+
+        computer._page.screenshot.assert_called_once_with(type="png", full_page=False)
+        computer._context.new_cdp_session.assert_not_called()
+        self.assertEqual(state.screenshot, b"png screenshot")
+        self.assertEqual(state.mime_type, "image/png")
+
+    def test_current_state_defaults_to_jpeg(self):
+        state = self.make_computer().current_state()
+
+        self.assertEqual(state.mime_type, "image/jpeg")
+
+
+if __name__ == '__main__':
+    unittest.main()